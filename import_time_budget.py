@@ -0,0 +1,67 @@
+import argparse
+import re
+import subprocess
+import sys
+
+MODULE = "med_results_parser.main"
+HEAVY_MODULES = ("polars", "psycopg2", "pydantic", "yaml")
+IMPORT_TIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure(module: str) -> tuple[int, set[str]]:
+    """
+    Import a module in a fresh interpreter with ``-X importtime``.
+
+    Returns:
+        tuple[int, set[str]]: Cumulative import time of the module in
+            microseconds, and the top-level packages imported with it.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    cumulative = None
+    imported = set()
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(3).split(".")[0])
+        if match.group(3) == module:
+            cumulative = int(match.group(1))
+    return cumulative, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=f"Fail if the cold start of {MODULE} exceeds a time budget."
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, default=150, help="Import time budget."
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Fresh interpreters to measure."
+    )
+    args = parser.parse_args()
+
+    # The best of several runs filters out disk cache and scheduler noise.
+    runs = [measure(MODULE) for _ in range(args.runs)]
+    best_us = min(cumulative for cumulative, _ in runs)
+    heavy = sorted(set(HEAVY_MODULES) & set.union(*(imported for _, imported in runs)))
+
+    print(f"{MODULE}: {best_us / 1000:.1f}ms (budget {args.budget_ms:.0f}ms)")
+    failed = False
+    if best_us / 1000 > args.budget_ms:
+        print("FAIL: import time is over budget.")
+        failed = True
+    if heavy:
+        print(f"FAIL: imported eagerly: {', '.join(heavy)}.")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
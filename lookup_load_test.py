@@ -0,0 +1,96 @@
+import argparse
+import random
+import statistics
+import time
+
+import polars as pl
+
+from med_results_parser.core.postgers_connector import PostgresConnector
+from med_results_parser.pipeline import RESULT_TABLE
+from med_results_parser.services.medical_data import MedicalDataService
+from med_results_parser.services.results_lookup import LOOKUP_COLUMNS, ResultsLookup
+from med_results_parser.settings.config import get_settings
+
+
+def synthetic_results(rows: int, patients: int) -> pl.DataFrame:
+    rng = random.Random(0)
+    codes = [rng.randrange(patients) for _ in range(rows)]
+    return pl.DataFrame(
+        {
+            "Телефон": [f"+7 (900) {code:07d}" for code in codes],
+            "Имя": [f"Patient {code}" for code in codes],
+            "Название анализа": [f"Analysis {rng.randrange(50)}" for _ in codes],
+            "Заключение": [rng.choice(["Повышен", "Понижен"]) for _ in codes],
+        },
+        schema={column: pl.Utf8 for column in LOOKUP_COLUMNS},
+    )
+
+
+def build_lookup(args) -> ResultsLookup:
+    settings = get_settings()
+    lookup = ResultsLookup(settings.pipeline.results_export_path)
+    if args.source == "db":
+        db_connector = PostgresConnector(
+            db_name=settings.db.db_name,
+            user=settings.db.db_user,
+            password=settings.db.db_password,
+            host=settings.db.host,
+            port=settings.db.port,
+        )
+        lookup.load_from_db(MedicalDataService(db_connector), RESULT_TABLE)
+    elif args.source == "export":
+        lookup.load_from_export()
+    else:
+        lookup.add(synthetic_results(args.rows, args.patients))
+    return lookup
+
+
+def measure(lookup, keys, method) -> list[int]:
+    latencies = []
+    for key in keys:
+        started = time.perf_counter_ns()
+        method(key)
+        latencies.append(time.perf_counter_ns() - started)
+    return latencies
+
+
+def report(name, latencies):
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<10} n={len(latencies)} "
+        f"p50={percentiles[49] / 1000:.2f}us "
+        f"p99={percentiles[98] / 1000:.2f}us "
+        f"max={max(latencies) / 1000:.2f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure p50/p99 latency of ResultsLookup lookups."
+    )
+    parser.add_argument(
+        "--source", choices=["synthetic", "db", "export"], default="synthetic"
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--patients", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    lookup = build_lookup(args)
+    print(f"Indexed {lookup.size} results in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(1)
+    phones = list(lookup.phones()) or ["0"]
+    patients = list(lookup.patients()) or [""]
+    # Mix hits with misses, as the call center also asks about unknown numbers.
+    phone_keys = [rng.choice(phones) for _ in range(args.lookups)]
+    phone_keys[::10] = ["70000000000"] * len(phone_keys[::10])
+    patient_keys = [rng.choice(patients) for _ in range(args.lookups)]
+
+    report("by_phone", measure(lookup, phone_keys, lookup.by_phone))
+    report("by_patient", measure(lookup, patient_keys, lookup.by_patient))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,28 @@ class DBConnector(ABC):
             params (tuple, optional): Parameters for the SQL query.
         """
 
+    @abstractmethod
+    def copy_records(self, table_name, column_names, records):
+        """
+        Bulk load records into a table.
+
+        Parameters:
+            table_name (str): The table to load the records into.
+            column_names (list[str]): Target column names.
+            records (Iterable[tuple]): Rows to load.
+        """
+
+    @abstractmethod
+    def stream_query(self, query, batch_size, params=None):
+        """
+        Execute a SELECT query and yield its rows in batches.
+
+        Parameters:
+            query (str): The SQL query to execute.
+            batch_size (int): Number of rows per batch.
+            params (tuple, optional): Parameters for the SQL query.
+        """
+
     @abstractmethod
     def close(self):
         """
@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+
+import polars as pl
+
+from med_results_parser.core.abstract_handler import FileHandlerBase
+from med_results_parser.settings.logger import get_logger
+
+logger = get_logger("IpcFileHandler")
+
+
+class IpcFileHandler(FileHandlerBase):
+    """
+    Concrete implementation of FileHandlerBase for Arrow IPC (.arrow) files.
+    """
+
+    def read(self, file_path: Path):
+        """
+        Read an Arrow IPC file, memory-mapping it instead of copying.
+
+        Parameters:
+            file_path (Path): Path to the Arrow IPC file.
+
+        Returns:
+            pl.DataFrame: Polars DataFrame containing the data.
+        """
+        try:
+            logger.info(f"Reading Arrow IPC file: {file_path}")
+            df = pl.read_ipc(file_path, memory_map=True)
+            logger.info(f"Successfully read Arrow IPC file: {file_path}")
+            return df
+        except FileNotFoundError:
+            logger.error(f"File not found: {file_path}")
+        except Exception as e:
+            logger.error(f"An unexpected error occurred: {e}")
+        return None
+
+    def write(self, file_path: Path, data):
+        """
+        Write data to an Arrow IPC file. The data is written to a temporary
+        file first and moved in place, so a partial write never replaces a
+        good file.
+
+        Parameters:
+            file_path (Path): Path to save the Arrow IPC file.
+            data (pl.DataFrame): Polars DataFrame to write.
+
+        Returns:
+            bool: True if the file was written.
+        """
+        tmp_path = Path(f"{file_path}.tmp")
+        try:
+            logger.info(f"Writing to Arrow IPC file: {file_path}")
+            data.write_ipc(tmp_path)
+            os.replace(tmp_path, file_path)
+            logger.info(f"Successfully wrote to Arrow IPC file: {file_path}")
+            return True
+        except Exception as e:
+            logger.error(f"An error occurred while writing to Arrow IPC file: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return False
+
+    def delete(self, file_path):
+        """
+        Delete an Arrow IPC file.
+
+        Parameters:
+            file_path (str): Path to the file to delete.
+        """
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                logger.info(f"Deleted file: {file_path}")
+            else:
+                logger.warning(f"File does not exist: {file_path}")
+        except Exception as e:
+            logger.error(f"An error occurred while deleting the file: {e}")
@@ -1,6 +1,9 @@
-import psycopg2
+import csv
+import io
+import time
 
 from med_results_parser.core.abstract_connector import DBConnector
+from med_results_parser.core.profiler import get_profiler
 from med_results_parser.settings.logger import get_logger
 
 logger = get_logger("DBConnector")
@@ -33,6 +36,8 @@ class PostgresConnector(DBConnector):
         """
         Establish a connection to the PostgreSQL database.
         """
+        import psycopg2  # Deferred: only runs that reach the database pay for it.
+
         try:
             logger.info("Connecting to PostgreSQL database...")
             self.connection = psycopg2.connect(
@@ -56,7 +61,8 @@ class PostgresConnector(DBConnector):
             params (tuple, optional): Parameters for the SQL query.
 
         Returns:
-            list: Query results for SELECT queries, or None for other queries.
+            list: Query results for SELECT queries and for statements with a
+                RETURNING clause, or None for other queries.
         """
         if not self.connection:
             logger.error("No database connection. Call `connect` first.")
@@ -65,18 +71,94 @@ class PostgresConnector(DBConnector):
         try:
             with self.connection.cursor() as cursor:
                 logger.info(f"Executing query: {query}")
+                started = time.perf_counter()
                 cursor.execute(query, params)
+                self._record_timing(query, started)
                 if query.strip().lower().startswith("select"):
                     result = cursor.fetchall()
                     logger.info(f"Query returned {len(result)} rows.")
                     return result
+                result = cursor.fetchall() if cursor.description else None
                 self.connection.commit()
                 logger.info("Query executed successfully.")
+                return result
         except Exception as e:
             logger.error(f"An error occurred while executing the query: {e}")
             self.connection.rollback()
             raise
 
+    def copy_records(self, table_name, column_names, records):
+        """
+        Bulk load records into a table with COPY FROM STDIN.
+
+        Parameters:
+            table_name (str): The table to load the records into.
+            column_names (list[str]): Target column names.
+            records (Iterable[tuple]): Rows to load.
+
+        Returns:
+            int: Number of rows loaded.
+        """
+        if not self.connection:
+            logger.error("No database connection. Call `connect` first.")
+            return None
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(records)
+        buffer.seek(0)
+
+        columns = ", ".join(f'"{col}"' for col in column_names)
+        query = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        try:
+            with self.connection.cursor() as cursor:
+                logger.info(f"Executing query: {query}")
+                started = time.perf_counter()
+                cursor.copy_expert(query, buffer)
+                self._record_timing(query, started)
+                self.connection.commit()
+                logger.info(f"Copied {cursor.rowcount} rows into '{table_name}'.")
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"An error occurred while copying records: {e}")
+            self.connection.rollback()
+            raise
+
+    def stream_query(self, query, batch_size, params=None):
+        """
+        Execute a SELECT query on a server-side cursor and yield its rows in
+        batches, so the full result never has to fit in memory.
+
+        Parameters:
+            query (str): The SQL query to execute.
+            batch_size (int): Number of rows per batch.
+            params (tuple, optional): Parameters for the SQL query.
+
+        Yields:
+            list[tuple]: The next batch of rows.
+        """
+        if not self.connection:
+            logger.error("No database connection. Call `connect` first.")
+            return
+
+        try:
+            with self.connection.cursor(name="stream_query") as cursor:
+                cursor.itersize = batch_size
+                logger.info(f"Streaming query: {query}")
+                cursor.execute(query, params)
+                while rows := cursor.fetchmany(batch_size):
+                    yield rows
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f"An error occurred while streaming the query: {e}")
+            self.connection.rollback()
+            raise
+
+    @staticmethod
+    def _record_timing(query, started):
+        profiler = get_profiler()
+        if profiler is not None:
+            profiler.record_query(query, time.perf_counter() - started)
+
     def close(self):
         """
         Close the database connection.
@@ -0,0 +1,229 @@
+import cProfile
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from med_results_parser.settings.logger import get_logger
+
+if TYPE_CHECKING:
+    import polars as pl
+
+logger = get_logger("Profiler")
+
+_active_profiler = None
+
+
+class ProfileMode(str, Enum):
+    DETERMINISTIC = "deterministic"
+    SAMPLING = "sampling"
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval and counts
+    collapsed stacks per stage, the input format of flamegraph.pl and
+    speedscope.
+    """
+
+    def __init__(self, thread_id: int, current_stage, interval: float = 0.005):
+        """
+        Parameters:
+            thread_id (int): Identifier of the thread to sample.
+            current_stage (Callable[[], str]): Returns the stage to attribute
+                a sample to.
+            interval (float): Seconds between two samples.
+        """
+        self.thread_id = thread_id
+        self.current_stage = current_stage
+        self.interval = interval
+        self.samples = defaultdict(Counter)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[self.current_stage()][";".join(reversed(stack))] += 1
+
+
+class RunProfiler:
+    """
+    Collects the profile of one run into a single directory: a ``.pstats``
+    file (deterministic mode) or a collapsed stack file (sampling mode) per
+    stage, the plan and node timings of every profiled Polars query, and the
+    duration of every SQL query in ``summary.json``.
+
+    Nested stages pause the enclosing one, so each stage file holds the
+    stage's own work only.
+    """
+
+    def __init__(
+        self, output_dir: Path, mode: ProfileMode = ProfileMode.DETERMINISTIC
+    ):
+        """
+        Parameters:
+            output_dir (Path): Directory receiving the profile of the run.
+            mode (ProfileMode): Deterministic (cProfile) or sampling profiler.
+        """
+        self.output_dir = Path(output_dir)
+        self.mode = ProfileMode(mode)
+        self.stages = []
+        self.queries = []
+        self.plans = []
+        self._stack = []
+        self._sampler = None
+
+    def __enter__(self):
+        global _active_profiler
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.mode == ProfileMode.SAMPLING:
+            self._sampler = StackSampler(
+                threading.get_ident(),
+                lambda: self._stack[-1][0] if self._stack else "main",
+            )
+            self._sampler.start()
+        _active_profiler = self
+        logger.info(f"Profiling run into {self.output_dir} ({self.mode.value}).")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_profiler
+        _active_profiler = None
+        if self._sampler is not None:
+            self._sampler.stop()
+            for stage, stacks in self._sampler.samples.items():
+                with open(self.output_dir / f"{stage}.collapsed", "w") as file:
+                    for stack, count in stacks.items():
+                        file.write(f"{stack} {count}\n")
+
+        with open(self.output_dir / "summary.json", "w") as file:
+            json.dump(
+                {
+                    "mode": self.mode.value,
+                    "stages": self.stages,
+                    "queries": self.queries,
+                    "polars": self.plans,
+                },
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+        logger.info(f"Profile written to {self.output_dir}.")
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Profile a pipeline stage.
+
+        Parameters:
+            name (str): Stage name, used in the profile file names.
+        """
+        stage_name = f"{len(self.stages) + len(self._stack):02d}_{name}"
+        profile = None
+        if self.mode == ProfileMode.DETERMINISTIC:
+            if self._stack:
+                self._stack[-1][1].disable()
+            profile = cProfile.Profile()
+
+        self._stack.append((stage_name, profile))
+        started = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.output_dir / f"{stage_name}.pstats")
+            self._stack.pop()
+            self.stages.append(
+                {"name": stage_name, "seconds": time.perf_counter() - started}
+            )
+            if profile is not None and self._stack:
+                self._stack[-1][1].enable()
+
+    def record_query(self, query: str, seconds: float):
+        self.queries.append({"query": " ".join(query.split()), "seconds": seconds})
+
+    def collect(self, lf: "pl.LazyFrame", name: str) -> "pl.DataFrame":
+        """
+        Collect a LazyFrame with ``LazyFrame.profile()``, saving its optimized
+        plan and per-node timings.
+
+        Parameters:
+            lf (pl.LazyFrame): Query to run.
+            name (str): Query name, used in the file names.
+
+        Returns:
+            pl.DataFrame: The collected query result.
+        """
+        query_name = f"{len(self.plans):02d}_{name}"
+        plan_path = self.output_dir / f"polars_{query_name}.plan.txt"
+        timings_path = self.output_dir / f"polars_{query_name}.timings.csv"
+
+        plan_path.write_text(lf.explain())
+        df, timings = lf.profile()
+        timings.write_csv(timings_path)
+        self.plans.append(
+            {"name": query_name, "plan": plan_path.name, "timings": timings_path.name}
+        )
+        return df
+
+
+def get_profiler():
+    """
+    Return the profiler of the current run, or None if profiling is off.
+    """
+    return _active_profiler
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Profile a pipeline stage when profiling is on, otherwise do nothing.
+
+    Parameters:
+        name (str): Stage name.
+    """
+    if _active_profiler is None:
+        yield
+        return
+    with _active_profiler.stage(name):
+        yield
+
+
+def collect(lf: "pl.LazyFrame", name: str) -> "pl.DataFrame":
+    """
+    Collect a LazyFrame, recording its plan and timings when profiling is on.
+
+    Parameters:
+        lf (pl.LazyFrame): Query to run.
+        name (str): Query name.
+
+    Returns:
+        pl.DataFrame: The collected query result.
+    """
+    if _active_profiler is None:
+        return lf.collect()
+    return _active_profiler.collect(lf, name)
@@ -0,0 +1,237 @@
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+from med_results_parser import PROJROOT
+from med_results_parser.core.exel_handler import ExcelFileHandler
+from med_results_parser.core.postgers_connector import PostgresConnector
+from med_results_parser.core.profiler import ProfileMode, RunProfiler, profile_stage
+from med_results_parser.services.checkpoints import CheckpointStore
+from med_results_parser.services.medical_data import MedicalDataService
+from med_results_parser.services.results_index import ResultsIndex
+from med_results_parser.services.results_lookup import export_results
+from med_results_parser.services.service_layer import MedicalDataServiceLayer
+from med_results_parser.settings.config import ProcessingEngine, get_settings
+from med_results_parser.settings.logger import get_logger
+
+logger = get_logger(__name__)
+
+RESULT_TABLE = "public.dvde_med_results"
+RESULT_SCHEMA = """
+    "Телефон" VARCHAR(30) NOT NULL,
+    "Имя" VARCHAR(255) NOT NULL,
+    "Название анализа" VARCHAR(255) NOT NULL,
+    "Заключение" TEXT
+"""
+RESULT_COLUMNS = ["Телефон", "Имя", "Название анализа", "Заключение"]
+
+
+def select_result_columns(result):
+    """
+    Selects the columns stored in the results table.
+
+    Parameters:
+        result (DataFrame): The processed Polars DataFrame.
+
+    Returns:
+        DataFrame: The rows as stored in the results table.
+    """
+    return result.select([
+        pl.col("Телефон"),
+        pl.col("Имя"),
+        pl.col("Расшифровка анализа").alias("Название анализа"),
+        pl.col("Заключение")
+    ])
+
+
+def prepare_data(result):
+    """
+    Prepares the data for insertion into the database.
+
+    Parameters:
+        result (DataFrame): The processed Polars DataFrame.
+
+    Returns:
+        list[tuple]: Prepared data as a list of tuples.
+    """
+    result_table = select_result_columns(result)
+    return [tuple(row) for row in result_table.iter_rows()]
+
+def insert_result_to_db(med_data, table_name, schema, data, column_names):
+    """
+    Creates the table if not exists and inserts the data.
+
+    Parameters:
+        med_data (MedicalDataService): The service object for database operations.
+        table_name (str): The name of the database table.
+        schema (str): The SQL schema for the table.
+        data (list[tuple]): The data to be inserted.
+        column_names (list[str]): The column names for the data.
+
+    Returns:
+        bool: True if the data was inserted.
+    """
+    try:
+        med_data.create_table(table_name, schema)
+    except Exception as e:
+        logger.error(f"Error creating table '{table_name}': {e}")
+
+    try:
+        med_data.save_insert_data(
+            table_name=table_name,
+            data=data,
+            column_names=column_names
+        )
+        logger.info(f"Data inserted successfully into '{table_name}'.")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to insert data into '{table_name}': {e}")
+        return False
+
+
+def build_checkpoints(conf, results_index=None):
+    """
+    Create the checkpoint store for the current inputs and configuration.
+
+    Parameters:
+        conf (Settings): Application settings.
+        results_index (ResultsIndex, optional): Results index the
+            ``deduplicated`` stage is computed against.
+
+    Returns:
+        CheckpointStore: Store keyed by the run fingerprint, or None if
+            checkpointing is disabled.
+    """
+    if not conf.pipeline.checkpoints:
+        return None
+
+    enum_path = conf.enum.enam_path or PROJROOT / "enum_values.yaml"
+    root = conf.pipeline.checkpoint_path or conf.project_path / "checkpoints"
+    return CheckpointStore(
+        root=Path(root),
+        input_paths=[
+            Path(conf.project_path / conf.med_data.file_name),
+            Path(enum_path),
+        ],
+        config={
+            "engine": conf.pipeline.engine.value,
+            "min_outliers": conf.pipeline.min_outliers,
+            "deduplicate": conf.pipeline.deduplicate,
+            "results_index": results_index.state() if results_index else None,
+        },
+    )
+
+
+def build_results_index(conf):
+    """
+    Create the index used to drop results already processed by earlier runs.
+
+    Parameters:
+        conf (Settings): Application settings.
+
+    Returns:
+        ResultsIndex: The results index, or None if deduplication is off.
+    """
+    if not conf.pipeline.deduplicate:
+        return None
+
+    path = conf.pipeline.results_index_path or (
+        conf.project_path / "results_index.arrow"
+    )
+    return ResultsIndex(Path(path))
+
+
+def build_profiler(conf, mode):
+    """
+    Create the profiler of a run, writing into a fresh per-run directory.
+
+    Parameters:
+        conf (Settings): Application settings.
+        mode (str): Profiler mode, or None if profiling is off.
+
+    Returns:
+        RunProfiler: The run profiler, or a no-op context if profiling is off.
+    """
+    if mode is None:
+        return nullcontext()
+
+    root = conf.pipeline.profile_path or conf.project_path / "profiles"
+    run_dir = Path(root) / datetime.now().strftime("%Y%m%d-%H%M%S")
+    return RunProfiler(run_dir, ProfileMode(mode))
+
+
+def run(args):
+    """
+    Run the pipeline: process the workbook, store the conclusions and export
+    them to Excel.
+
+    Parameters:
+        args (argparse.Namespace): Parsed command line arguments.
+    """
+    settings = get_settings()
+    try:
+        db_connector = PostgresConnector(
+            db_name=settings.db.db_name,
+            user=settings.db.db_user,
+            password=settings.db.db_password,
+            host=settings.db.host,
+            port=settings.db.port,
+        )
+        handler = ExcelFileHandler()
+        med_data = MedicalDataService(db_connector)
+        results_index = build_results_index(settings)
+        checkpoints = build_checkpoints(settings, results_index)
+        medical_service = MedicalDataServiceLayer(
+            med_data,
+            handler,
+            settings,
+            checkpoints=checkpoints,
+            resume=args.resume,
+            results_index=results_index,
+        )
+
+        if settings.pipeline.engine == ProcessingEngine.SQL:
+            try:
+                med_data.create_table(RESULT_TABLE, RESULT_SCHEMA)
+            except Exception as e:
+                logger.error(f"Error creating table '{RESULT_TABLE}': {e}")
+            with profile_stage("process_in_database"):
+                result = medical_service.process_in_database(RESULT_TABLE)
+            inserted = True
+        else:
+            with profile_stage("load_and_process_data"):
+                result = medical_service.load_and_process_data()
+            with profile_stage("prepare_data"):
+                data = prepare_data(result)
+
+            with profile_stage("insert_result_to_db"):
+                inserted = insert_result_to_db(
+                    med_data=med_data,
+                    table_name=RESULT_TABLE,
+                    schema=RESULT_SCHEMA,
+                    data=data,
+                    column_names=RESULT_COLUMNS,
+                )
+
+        if inserted:
+            # The results are stored: clear the checkpoints before anything
+            # else can fail, so --resume never inserts them again. The index
+            # update reads the stage checkpoints, so it is computed first.
+            results_index = medical_service.updated_results_index()
+            if checkpoints is not None:
+                checkpoints.clear()
+            medical_service.commit_results_index(results_index)
+            if settings.pipeline.results_export_path:
+                export_results(
+                    Path(settings.pipeline.results_export_path),
+                    select_result_columns(result),
+                )
+
+        with profile_stage("write_excel"):
+            handler.write((settings.project_path / 'result.xlsx'), result)
+        logger.info("Data saved to Excel successfully.")
+
+    except Exception as ex:
+        logger.error(f"Failed to process data: {ex}")
@@ -1,13 +1,20 @@
 from enum import Enum
+from functools import lru_cache
 from typing import Union
 
 from pydantic import BaseModel, Field, field_validator
 
 from med_results_parser import PROJROOT
 from med_results_parser.core.yaml_handler import YamlFileHandler
-from med_results_parser.settings.config import settings
+from med_results_parser.settings.config import get_settings
 
-yml_loader = YamlFileHandler()
+
+@lru_cache(maxsize=None)
+def load_enum_mapping(enum_path: str):
+    """
+    Read the enum mapping once per path instead of once per validated value.
+    """
+    return YamlFileHandler().read(enum_path)
 
 
 class ValueEnum(str, Enum):
@@ -27,8 +34,5 @@ class AnalysisModel(BaseModel):
 
     @field_validator("value", mode="after")
     def validate_value(cls, v):
-        if settings.enum.enam_path:
-            enum_mapping = yml_loader.read(settings.enum.enam_path)
-        else:
-            enum_mapping = yml_loader.read(PROJROOT / "enum_values.yaml")
-        return ValueEnum.to_numeric(v, enum_mapping)
+        enum_path = get_settings().enum.enam_path or PROJROOT / "enum_values.yaml"
+        return ValueEnum.to_numeric(v, load_enum_mapping(str(enum_path)))
@@ -0,0 +1,115 @@
+import hashlib
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+import polars as pl
+
+from med_results_parser.core.ipc_handler import IpcFileHandler
+from med_results_parser.settings.logger import get_logger
+
+logger = get_logger("Checkpoints")
+
+# Bump when the output of a pipeline stage changes shape or meaning, so
+# checkpoints written by older code are never resumed from.
+CHECKPOINT_VERSION = 2
+
+
+def code_version() -> str:
+    """
+    Version of the installed package combined with ``CHECKPOINT_VERSION``.
+
+    Returns:
+        str: Code version used in checkpoint keys.
+    """
+    try:
+        package_version = version("de-hw2")
+    except PackageNotFoundError:
+        package_version = "unknown"
+    return f"{package_version}-{CHECKPOINT_VERSION}"
+
+
+class CheckpointStore:
+    """
+    Stores the output of each pipeline stage as an Arrow IPC file.
+
+    Checkpoints live in ``<root>/<key>/<stage>.arrow``, where the key is a
+    fingerprint of the input files, the code version and the configuration,
+    so a changed workbook or setting never resumes from stale data.
+    """
+
+    def __init__(self, root: Path, input_paths: list[Path], config: dict):
+        """
+        Parameters:
+            root (Path): Directory holding the checkpoints.
+            input_paths (list[Path]): Files whose content keys the checkpoints.
+            config (dict): Configuration values that affect stage output.
+        """
+        self.handler = IpcFileHandler()
+        self.key = self.fingerprint(input_paths, config)
+        self.path = Path(root) / self.key
+
+    @staticmethod
+    def fingerprint(input_paths: list[Path], config: dict) -> str:
+        """
+        Hash input file contents, the code version and the configuration.
+
+        Parameters:
+            input_paths (list[Path]): Input files to hash.
+            config (dict): Configuration values to hash.
+
+        Returns:
+            str: Hex digest identifying the run inputs.
+        """
+        digest = hashlib.sha256(code_version().encode())
+        for input_path in input_paths:
+            digest.update(str(input_path).encode())
+            with open(input_path, "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(chunk)
+        for name, value in sorted(config.items()):
+            digest.update(f"{name}={value}".encode())
+        return digest.hexdigest()[:16]
+
+    def stage_path(self, stage: str) -> Path:
+        return self.path / f"{stage}.arrow"
+
+    def load(self, stage: str):
+        """
+        Memory-map the checkpoint of a stage.
+
+        Parameters:
+            stage (str): Stage name.
+
+        Returns:
+            pl.DataFrame: Stage output, or None if there is no checkpoint.
+        """
+        stage_path = self.stage_path(stage)
+        if not stage_path.exists():
+            return None
+        logger.info(f"Resuming stage '{stage}' from checkpoint {stage_path}.")
+        return self.handler.read(stage_path)
+
+    def save(self, stage: str, data: pl.DataFrame):
+        """
+        Write the checkpoint of a stage.
+
+        Parameters:
+            stage (str): Stage name.
+            data (pl.DataFrame): Stage output.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.handler.write(self.stage_path(stage), data)
+
+    def clear(self):
+        """
+        Remove all checkpoints of this run once it has completed.
+        """
+        if not self.path.exists():
+            return
+        for stage_path in self.path.glob("*.arrow"):
+            self.handler.delete(stage_path)
+        try:
+            self.path.rmdir()
+            logger.info(f"Cleared checkpoints in {self.path}.")
+        except OSError as e:
+            logger.warning(f"Could not remove checkpoint directory: {e}")
@@ -1,11 +1,44 @@
+import hashlib
 import logging
+import math
+from datetime import datetime
+from pathlib import Path
 from typing import Type
 
 import polars as pl
 from pydantic import BaseModel
 
+from med_results_parser.core.profiler import collect
+
 logger = logging.getLogger(__name__)
 
+RESULTS_INDEX_SCHEMA = {
+    "key_hash": pl.UInt64,
+    "row_hash": pl.UInt64,
+    "source_ts": pl.Datetime("us"),
+    "Код пациента": pl.Int64,
+    "Анализ": pl.String,
+    "Значение": pl.Float64,
+}
+
+
+PARTITION_COLUMN = "__partition"
+# Joins and aggregations need several times the size of their inputs, so
+# partitions are sized well below the memory budget.
+SPILL_HEADROOM = 4
+# Every partition costs a Parquet file per spilled batch and a merge pass.
+MAX_SPILL_PARTITIONS = 64
+SPILL_BATCH_ROWS = 250_000
+
+
+def _stable_hash(*parts) -> int:
+    """
+    64-bit hash that, unlike ``Expr.hash``, is stable across processes and
+    polars versions, so it can be persisted between runs.
+    """
+    payload = "\x1f".join(str(part) for part in parts).encode()
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "big")
+
 
 class DataProcessLayer:
     """
@@ -24,17 +57,17 @@ class DataProcessLayer:
         Returns:
             pl.DataFrame: The processed Polars DataFrame.
         """
-        df = df.with_columns(
-            pl.when(df["is_simple"] == "Y")
+        lf = df.lazy().with_columns(
+            pl.when(pl.col("is_simple") == "Y")
             .then(0)
-            .otherwise(df["min_value"])
+            .otherwise(pl.col("min_value"))
             .alias("min_value"),
-            pl.when(df["is_simple"] == "Y")
+            pl.when(pl.col("is_simple") == "Y")
             .then(1)
-            .otherwise(df["max_value"])
+            .otherwise(pl.col("max_value"))
             .alias("max_value"),
         )
-        return df
+        return collect(lf, "process_med_an_name_data")
 
     @classmethod
     def validate_polars_df(
@@ -77,9 +110,11 @@ class DataProcessLayer:
         Returns:
             pl.DataFrame: A DataFrame containing outlier details.
         """
-        results = results.with_columns(pl.col("Значение").cast(pl.Float64))
+        results = results.lazy().with_columns(pl.col("Значение").cast(pl.Float64))
 
-        joined = results.join(table2, left_on="Анализ", right_on="id", how="inner")
+        joined = results.join(
+            table2.lazy(), left_on="Анализ", right_on="id", how="inner"
+        )
         joined = joined.with_columns(
             pl.when(pl.col("is_simple") == "Y")
             .then(pl.col("Значение") == 1)
@@ -102,11 +137,14 @@ class DataProcessLayer:
                 "is_simple",
             ]
         )
-        return result
+        return collect(result, "get_outliers_with_details")
 
     @classmethod
     def merge_with_patients(
-        cls, outliers: pl.DataFrame, patients: pl.DataFrame, min_outliers: int = 2
+        cls,
+        outliers: pl.DataFrame,
+        patients: pl.DataFrame,
+        min_outliers: int = 2,
     ) -> pl.DataFrame:
         """
         Merge the outliers table with the patients table and include a conclusion.
@@ -119,6 +157,7 @@ class DataProcessLayer:
         Returns:
             pl.DataFrame: Merged DataFrame with patient information and conclusions.
         """
+        outliers = outliers.lazy()
         outlier_counts = (
             outliers.group_by("Код пациента")
             .agg(pl.count("Анализ").alias("outlier_count"))
@@ -138,7 +177,7 @@ class DataProcessLayer:
         )
 
         result = filtered_outliers.join(
-            patients, left_on="Код пациента", right_on="id"
+            patients.lazy(), left_on="Код пациента", right_on="id"
         ).select(
             pl.col("name").alias("Имя"),
             pl.col("phone").alias("Телефон"),
@@ -148,4 +187,209 @@ class DataProcessLayer:
             pl.col("Заключение"),
             pl.col("is_simple"),
         )
-        return result
+        return collect(result, "merge_with_patients")
+
+    @staticmethod
+    def spill_partition_count(estimated_size: int, memory_budget: int) -> int:
+        """
+        Number of partitions to merge inputs of ``estimated_size`` bytes in,
+        1 if they fit in ``memory_budget``.
+
+        Args:
+            estimated_size (int): Estimated size of the inputs in bytes.
+            memory_budget (int): Memory budget in bytes.
+
+        Returns:
+            int: Number of partitions, at most ``MAX_SPILL_PARTITIONS``; a
+                warning is logged when the cap is hit.
+        """
+        if estimated_size <= memory_budget:
+            return 1
+        partitions = max(2, math.ceil(estimated_size * SPILL_HEADROOM / memory_budget))
+        if partitions > MAX_SPILL_PARTITIONS:
+            logger.warning(
+                f"Inputs of ~{estimated_size} bytes need {partitions} partitions "
+                f"to fit the memory budget of {memory_budget} bytes, merging in "
+                f"{MAX_SPILL_PARTITIONS}; partitions may exceed the budget."
+            )
+            return MAX_SPILL_PARTITIONS
+        return partitions
+
+    @staticmethod
+    def spill_partitions(batches, key: str, partitions: int, directory: Path):
+        """
+        Write batches of rows to ``directory/<partition>/<batch>.parquet``,
+        hash partitioned on ``key``, in a single pass over each batch. The key
+        is cast to Int64 first, so equal keys of both join sides land in the
+        same partition.
+
+        Args:
+            batches (Iterable[pl.DataFrame]): Rows to spill.
+            key (str): Column to partition on.
+            partitions (int): Number of partitions.
+            directory (Path): Directory receiving the partitions.
+        """
+        directory.mkdir()
+        for batch_number, batch in enumerate(batches):
+            parts = batch.with_columns(
+                (pl.col(key).cast(pl.Int64).hash() % partitions).alias(
+                    PARTITION_COLUMN
+                )
+            ).partition_by(PARTITION_COLUMN, as_dict=True, include_key=False)
+            for (partition,), part in parts.items():
+                partition_path = directory / str(partition)
+                partition_path.mkdir(exist_ok=True)
+                part.write_parquet(partition_path / f"{batch_number}.parquet")
+
+    @classmethod
+    def merge_spilled_partitions(
+        cls,
+        outliers_dir: Path,
+        patients_dir: Path,
+        partitions: int,
+        min_outliers: int,
+    ) -> list[pl.DataFrame]:
+        """
+        Merge outliers and patients spilled by ``spill_partitions`` one
+        partition at a time. Outlier counts are per patient, so a partition by
+        patient merges exactly like the whole table.
+
+        Args:
+            outliers_dir (Path): Directory of the spilled outliers.
+            patients_dir (Path): Directory of the spilled patients.
+            partitions (int): Number of partitions.
+            min_outliers (int): Minimum number of outliers to consider.
+
+        Returns:
+            list[pl.DataFrame]: Merged rows of every partition with both
+                outliers and patients.
+        """
+        merged = []
+        for partition in range(partitions):
+            outliers_path = outliers_dir / str(partition)
+            patients_path = patients_dir / str(partition)
+            if outliers_path.exists() and patients_path.exists():
+                merged.append(
+                    cls.merge_with_patients(
+                        pl.read_parquet(outliers_path / "*.parquet"),
+                        pl.read_parquet(patients_path / "*.parquet"),
+                        min_outliers,
+                    )
+                )
+            logger.info(f"Merged partition {partition + 1}/{partitions}.")
+        return merged
+
+    @classmethod
+    def hash_results(cls, results: pl.DataFrame, source_ts: datetime) -> pl.DataFrame:
+        """
+        Tag validated results with their source timestamp, a hash of
+        (patient, analysis) and a hash of (patient, analysis, value).
+
+        Args:
+            results (pl.DataFrame): Validated results.
+            source_ts (datetime): When the source of the results was produced.
+
+        Returns:
+            pl.DataFrame: Results with the ``RESULTS_INDEX_SCHEMA`` columns.
+        """
+        results = results.select(
+            pl.col("Код пациента").cast(RESULTS_INDEX_SCHEMA["Код пациента"]),
+            pl.col("Анализ").cast(RESULTS_INDEX_SCHEMA["Анализ"]),
+            pl.col("Значение").cast(RESULTS_INDEX_SCHEMA["Значение"]),
+        )
+        values = results.rows()
+        return results.with_columns(
+            pl.Series(
+                "key_hash",
+                [_stable_hash(patient, analysis) for patient, analysis, _ in values],
+                dtype=pl.UInt64,
+            ),
+            pl.Series(
+                "row_hash",
+                [_stable_hash(*row) for row in values],
+                dtype=pl.UInt64,
+            ),
+            pl.lit(source_ts).cast(RESULTS_INDEX_SCHEMA["source_ts"]).alias(
+                "source_ts"
+            ),
+        ).select(list(RESULTS_INDEX_SCHEMA))
+
+    @classmethod
+    def select_changed_results(
+        cls, results: pl.DataFrame, index: pl.DataFrame
+    ) -> pl.DataFrame:
+        """
+        Keep the current results of the patients with a new or corrected
+        result, the latest source winning.
+
+        Within ``results`` only the latest row per (patient, analysis) is kept.
+        A row changes a pair unless the index already holds the same value or
+        a value from a source at least as recent. For every patient with a
+        changed pair, all current pairs are returned: the newest value of each,
+        from ``results`` or from the index. Outliers are thus counted over the
+        patient's full current results, not only the pairs that changed.
+
+        Args:
+            results (pl.DataFrame): Results tagged by ``hash_results``.
+            index (pl.DataFrame): Index of results processed by earlier runs.
+
+        Returns:
+            pl.DataFrame: Current results of the patients with changes.
+        """
+        columns = list(RESULTS_INDEX_SCHEMA)
+        seen = index.lazy().select(
+            pl.col("key_hash"),
+            pl.col("row_hash").alias("seen_row_hash"),
+            pl.col("source_ts").alias("seen_source_ts"),
+        )
+        changed = (
+            results.lazy()
+            .sort("source_ts", maintain_order=True)
+            .unique(subset=["key_hash"], keep="last", maintain_order=True)
+            .join(seen, on="key_hash", how="left")
+            .filter(
+                pl.col("seen_row_hash").is_null()
+                | (
+                    (pl.col("row_hash") != pl.col("seen_row_hash"))
+                    & (pl.col("source_ts") > pl.col("seen_source_ts"))
+                )
+            )
+            .select(columns)
+        )
+        # Only the index entries of changed patients are read back.
+        changed_patients = changed.select("Код пациента").unique()
+        previous = index.lazy().join(
+            changed_patients, on="Код пациента", how="semi"
+        )
+        lf = pl.concat([previous.select(columns), changed]).unique(
+            subset=["key_hash"], keep="last", maintain_order=True
+        )
+        return collect(lf, "select_changed_results")
+
+    @classmethod
+    def update_results_index(
+        cls, index: pl.DataFrame, results: pl.DataFrame
+    ) -> pl.DataFrame:
+        """
+        Record current results in the index, one entry per
+        (patient, analysis) sorted by its hash.
+
+        Args:
+            index (pl.DataFrame): Index of results processed by earlier runs.
+            results (pl.DataFrame): Results returned by
+                ``select_changed_results``.
+
+        Returns:
+            pl.DataFrame: The updated index.
+        """
+        lf = (
+            pl.concat(
+                [
+                    index.lazy(),
+                    results.lazy().select(list(RESULTS_INDEX_SCHEMA)),
+                ]
+            )
+            .unique(subset=["key_hash"], keep="last", maintain_order=True)
+            .sort("key_hash")
+        )
+        return collect(lf, "update_results_index")
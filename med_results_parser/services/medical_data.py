@@ -45,19 +45,17 @@ class MedicalDataService:
         """
         Inserts data into the specified table.
 
+        The rows are loaded with a single COPY, committed once, so a failed
+        insert leaves no rows behind and the run can be resumed safely.
+
         Parameters:
             table_name (str): Name of the table to insert data into.
             data (list[tuple]): List of tuples containing the data to insert.
             column_names (list[str]): List of column names for the data.
         """
-        columns = ", ".join(f'"{col}"' for col in column_names)
-        placeholders = ", ".join(["%s"] * len(column_names))
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders});"
-
         try:
             with self.db_connector as connector:
-                for record in data:
-                    connector.execute_query(query, params=record)
+                connector.copy_records(table_name, column_names, data)
                 logger.info(f"Inserted {len(data)} rows into table '{table_name}'.")
         except Exception as e:
             logger.error(f"Failed to insert data into '{table_name}': {e}")
@@ -82,15 +80,111 @@ class MedicalDataService:
                 results = connector.execute_query(query)
                 logger.info(f"Fetched {len(results)} rows from table '{table_name}'.")
 
-            processed_results = [
-                {
-                    column: float(value) if isinstance(value, Decimal) else value
-                    for column, value in zip(column_names, row)
-                }
-                for row in results
-            ]
-
-            return pl.DataFrame(processed_results)
+            return self._rows_to_dataframe(results, column_names)
         except Exception as e:
             logger.error(f"Error fetching data from '{table_name}': {e}")
             raise
+
+    def load_table_batches(
+        self,
+        table_name: str,
+        query: str,
+        column_names: list[str],
+        batch_size: int,
+        dtypes: dict = None,
+    ):
+        """
+        Load data from a database table in batches, keeping one batch in
+        memory at a time.
+
+        Parameters:
+            table_name (str): Name of the table to load data from.
+            query (str): SQL query to fetch the data.
+            column_names (list[str]): List of column names to process results.
+            batch_size (int): Number of rows per batch.
+            dtypes (dict, optional): Polars dtypes of the columns, so every
+                batch has the same schema.
+
+        Yields:
+            pl.DataFrame: The next batch of rows.
+        """
+        try:
+            with self.db_connector as connector:
+                fetched = 0
+                for rows in connector.stream_query(query, batch_size):
+                    fetched += len(rows)
+                    yield self._rows_to_dataframe(rows, column_names, dtypes)
+                logger.info(f"Streamed {fetched} rows from table '{table_name}'.")
+        except Exception as e:
+            logger.error(f"Error streaming data from '{table_name}': {e}")
+            raise
+
+    def table_size(self, table_name: str) -> int:
+        """
+        On-disk size of a table in bytes, as an estimate of its size in
+        memory before loading it.
+
+        Parameters:
+            table_name (str): Name of the table.
+
+        Returns:
+            int: Size of the table in bytes.
+        """
+        with self.db_connector as connector:
+            ((size,),) = connector.execute_query(
+                "SELECT pg_table_size(%s::regclass);", params=(table_name,)
+            )
+        return size
+
+    def stage_and_execute(
+        self,
+        staging_query: str,
+        staging_table: str,
+        staging_columns: list[str],
+        data: list[tuple],
+        query: str,
+        column_names: list[str],
+        params: dict = None,
+        dtypes: dict = None,
+    ) -> pl.DataFrame:
+        """
+        Bulk load data into a session-local staging table and run a query
+        against it within the same connection.
+
+        Parameters:
+            staging_query (str): SQL creating the staging table.
+            staging_table (str): Name of the staging table.
+            staging_columns (list[str]): Staging columns to COPY the data into.
+            data (list[tuple]): Rows to stage.
+            query (str): SQL query executed once the data is staged.
+            column_names (list[str]): List of column names to process results.
+            params (dict, optional): Parameters for the SQL query.
+            dtypes (dict, optional): Polars dtypes of the result columns.
+
+        Returns:
+            pl.DataFrame: A Polars DataFrame containing the rows returned by
+                the query.
+        """
+        try:
+            with self.db_connector as connector:
+                connector.execute_query(staging_query)
+                connector.copy_records(staging_table, staging_columns, data)
+                results = connector.execute_query(query, params=params) or []
+                logger.info(f"Query on '{staging_table}' returned {len(results)} rows.")
+
+            return self._rows_to_dataframe(results, column_names, dtypes)
+        except Exception as e:
+            logger.error(f"Error processing data staged in '{staging_table}': {e}")
+            raise
+
+    @staticmethod
+    def _rows_to_dataframe(
+        rows: list[tuple], column_names: list[str], dtypes: dict = None
+    ) -> pl.DataFrame:
+        processed_results = [
+            tuple(float(value) if isinstance(value, Decimal) else value for value in row)
+            for row in rows
+        ]
+        # An explicit schema keeps the columns when the query returns no rows.
+        df = pl.DataFrame(processed_results, schema=column_names, orient="row")
+        return df.cast(dtypes) if dtypes else df
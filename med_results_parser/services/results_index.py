@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import polars as pl
+
+from med_results_parser.core.ipc_handler import IpcFileHandler
+from med_results_parser.services.data_processing import RESULTS_INDEX_SCHEMA
+from med_results_parser.settings.logger import get_logger
+
+logger = get_logger("ResultsIndex")
+
+
+class ResultsIndex:
+    """
+    Persistent index of the lab results processed by earlier runs, stored as
+    an Arrow IPC file with the current value, its hashes and source timestamp
+    for each (patient, analysis) pair, sorted by key_hash.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Parameters:
+            path (Path): Path of the index file.
+        """
+        self.handler = IpcFileHandler()
+        self.path = Path(path)
+
+    def state(self) -> str:
+        """
+        Size and modification time of the index file, which change whenever
+        a run is recorded in it.
+
+        Returns:
+            str: State of the index, "missing" if there is no file yet.
+        """
+        if not self.path.exists():
+            return "missing"
+        stat = self.path.stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def load(self) -> pl.DataFrame:
+        """
+        Memory-map the index.
+
+        Returns:
+            pl.DataFrame: The index, empty if no run has been recorded yet.
+        """
+        if not self.path.exists():
+            logger.info(f"No results index at {self.path}, starting empty.")
+            return pl.DataFrame(schema=RESULTS_INDEX_SCHEMA)
+
+        index = self.handler.read(self.path)
+        if index is None:
+            raise ValueError(f"Failed to read results index at {self.path}")
+        if index.schema != pl.Schema(RESULTS_INDEX_SCHEMA):
+            raise ValueError(
+                f"Results index at {self.path} has an outdated layout, "
+                "remove it to rebuild the index."
+            )
+        logger.info(f"Loaded results index with {index.height} entries.")
+        return index
+
+    def save(self, index: pl.DataFrame):
+        """
+        Replace the index file.
+
+        Parameters:
+            index (pl.DataFrame): The updated index.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.handler.write(self.path, index):
+            raise ValueError(f"Failed to write results index at {self.path}")
+        logger.info(f"Saved results index with {index.height} entries.")
@@ -0,0 +1,201 @@
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+
+import polars as pl
+
+from med_results_parser.core.ipc_handler import IpcFileHandler
+from med_results_parser.settings.logger import get_logger
+
+logger = get_logger("ResultsLookup")
+
+LOOKUP_COLUMNS = ["Телефон", "Имя", "Название анализа", "Заключение"]
+
+
+def normalize_phone(phone) -> str:
+    """
+    Keep only the digits of a phone number, so "+7 (900) 123-45-67" and
+    "79001234567" hit the same entry.
+    """
+    return "".join(char for char in str(phone) if char.isdigit())
+
+
+def export_results(export_path: Path, data: pl.DataFrame) -> Path:
+    """
+    Write the results inserted by one pipeline run as an Arrow IPC file, for
+    ``ResultsLookup.refresh`` to pick up.
+
+    Parameters:
+        export_path (Path): Directory holding the per-run exports.
+        data (pl.DataFrame): Inserted rows with the ``LOOKUP_COLUMNS``.
+
+    Returns:
+        Path: Path of the written export.
+    """
+    export_path = Path(export_path)
+    export_path.mkdir(parents=True, exist_ok=True)
+    file_path = export_path / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.arrow"
+    if not IpcFileHandler().write(file_path, data.select(LOOKUP_COLUMNS)):
+        raise ValueError(f"Failed to write results export at {file_path}")
+    return file_path
+
+
+class ResultsLookup:
+    """
+    Read-side, in-memory index of the latest results in
+    ``dvde_med_results``, looked up by phone (digits only) or by patient name.
+
+    Rows are stored per patient, identified by (name, phone), and analysis, so
+    patients sharing a name or a phone never overwrite each other. An export
+    replaces all results of every patient it contains, as each run writes the
+    full current set of flagged results of the patients it processed. The
+    index is filled from the database or from the per-run Arrow IPC exports
+    and refreshed incrementally from exports written after it was loaded.
+    Lookups return tuples of read-only rows.
+    """
+
+    def __init__(self, export_path: Path = None):
+        """
+        Parameters:
+            export_path (Path, optional): Directory of per-run exports.
+        """
+        self.handler = IpcFileHandler()
+        self.export_path = Path(export_path) if export_path else None
+        self._results = {}
+        self._by_phone = {}
+        self._by_name = {}
+        self._applied_exports = set()
+
+    def load_from_db(self, med_data_service, table_name: str):
+        """
+        Replace the index with the content of the results table. Exports
+        present before the table is queried are treated as already contained
+        in it.
+
+        The table is append-only and has no run marker, so rows are read in
+        physical (insertion) order and merged: the last row of an analysis
+        wins, but an analysis no longer flagged by a later run stays.
+
+        Parameters:
+            med_data_service (MedicalDataService): Service to query with.
+            table_name (str): Name of the results table.
+        """
+        # Listed before the query: an export written while it runs may be
+        # missing from its result and must stay unapplied.
+        exports = set(self._export_files())
+        columns = ", ".join(f'"{col}"' for col in LOOKUP_COLUMNS)
+        data = med_data_service.load_table_data(
+            table_name=table_name,
+            query=f"SELECT {columns} FROM {table_name} ORDER BY ctid;",
+            column_names=LOOKUP_COLUMNS,
+        )
+        self._clear()
+        self._applied_exports = exports
+        self.add(data, replace=False)
+        logger.info(f"Loaded {self.size} results from '{table_name}'.")
+
+    def load_from_export(self):
+        """
+        Replace the index with the content of all per-run exports.
+        """
+        self._clear()
+        self._applied_exports = set()
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Apply the exports written since the last load or refresh.
+
+        Returns:
+            int: Number of rows applied.
+        """
+        added = 0
+        for file_path in sorted(set(self._export_files()) - self._applied_exports):
+            data = self.handler.read(file_path)
+            if data is None:
+                continue
+            added += self.add(data)
+            self._applied_exports.add(file_path)
+        if added:
+            logger.info(f"Refreshed lookup with {added} results.")
+        return added
+
+    def add(self, data: pl.DataFrame, replace: bool = True) -> int:
+        """
+        Index result rows.
+
+        Parameters:
+            data (pl.DataFrame): Rows with the ``LOOKUP_COLUMNS``.
+            replace (bool): Drop the indexed results of every patient in
+                ``data`` first, instead of replacing them analysis by
+                analysis.
+
+        Returns:
+            int: Number of rows applied.
+        """
+        if data.is_empty():
+            return 0
+        replaced = set()
+        for row in data.select(LOOKUP_COLUMNS).iter_rows(named=True):
+            row = MappingProxyType(row)
+            phone = normalize_phone(row["Телефон"])
+            patient = (row["Имя"], phone)
+            if replace and patient not in replaced:
+                self._results[patient] = {}
+                replaced.add(patient)
+            self._results.setdefault(patient, {})[row["Название анализа"]] = row
+            self._by_phone.setdefault(phone, {})[patient] = None
+            self._by_name.setdefault(row["Имя"], {})[patient] = None
+        return data.height
+
+    @property
+    def size(self) -> int:
+        """
+        Number of indexed (patient, analysis) results.
+        """
+        return sum(len(rows) for rows in self._results.values())
+
+    def by_phone(self, phone) -> tuple:
+        """
+        Latest results flagged for the patients with a phone number.
+
+        Parameters:
+            phone (str): Phone number in any formatting.
+
+        Returns:
+            tuple[Mapping]: Matching result rows, one per patient and analysis.
+        """
+        return self._collect(self._by_phone.get(normalize_phone(phone), ()))
+
+    def by_patient(self, name: str) -> tuple:
+        """
+        Latest results flagged for the patients with a name.
+
+        Parameters:
+            name (str): Patient name.
+
+        Returns:
+            tuple[Mapping]: Matching result rows, one per patient and analysis.
+        """
+        return self._collect(self._by_name.get(name, ()))
+
+    def phones(self):
+        return self._by_phone.keys()
+
+    def patients(self):
+        return self._by_name.keys()
+
+    def _collect(self, patients) -> tuple:
+        return tuple(
+            row for patient in patients for row in self._results[patient].values()
+        )
+
+    def _clear(self):
+        self._results = {}
+        self._by_phone = {}
+        self._by_name = {}
+
+    def _export_files(self):
+        if self.export_path is None or not self.export_path.exists():
+            return []
+        return list(self.export_path.glob("*.arrow"))
@@ -1,17 +1,41 @@
+import tempfile
+from datetime import datetime
 from pathlib import Path
 
+import polars as pl
+
+from med_results_parser.core.profiler import profile_stage
 from med_results_parser.serialziers.med_serializer import AnalysisModel
-from med_results_parser.services.data_processing import DataProcessLayer
+from med_results_parser.services.data_processing import (
+    SPILL_BATCH_ROWS,
+    DataProcessLayer,
+)
+from med_results_parser.services.sql_processing import SqlProcessLayer
 from med_results_parser.settings.logger import get_logger
 
 logger = get_logger("Service_layer")
 
+PATIENT_TABLE = "de.med_name"
+PATIENT_SCHEMA = {"id": pl.Int64, "name": pl.String, "phone": pl.String}
+
 
 class MedicalDataServiceLayer:
-    def __init__(self, med_data_service, data_handler, conf):
+    def __init__(
+        self,
+        med_data_service,
+        data_handler,
+        conf,
+        checkpoints=None,
+        resume=False,
+        results_index=None,
+    ):
         self.db_connector = med_data_service
         self.data_handler = data_handler
         self.settings = conf
+        self.checkpoints = checkpoints
+        self.resume = resume
+        self.results_index = results_index
+        self._stages = {}
 
     def process_polars_mde(self, f_path: Path, sheet_name: str, model):
         """
@@ -45,45 +69,270 @@ class MedicalDataServiceLayer:
         """
         Load and process medical data from the database and perform analysis.
 
+        When resuming, stages with a checkpoint are restored instead of being
+        recomputed, and the inputs of a restored stage are never loaded.
+
         Returns:
             pl.DataFrame: Processed data with outliers and conclusions.
         """
         try:
-            patient_data = self.db_connector.load_table_data(
-                table_name="de.med_name",
-                query="SELECT id, name, phone FROM de.med_name;",
-                column_names=["id", "name", "phone"],
-            )
-            logger.info("Patient data loaded successfully.")
-
-            analysis_data = self.db_connector.load_table_data(
-                table_name="de.med_an_name",
-                query="""
-                SELECT id, name, is_simple, min_value, max_value FROM de.med_an_name;
-                """,
-                column_names=["id", "name", "is_simple", "min_value", "max_value"],
+            return self.run_stage("result", self._merge_outliers_with_patients)
+        except Exception as e:
+            logger.error(f"Error during data processing: {e}")
+            raise
+
+    def run_stage(self, stage: str, compute):
+        """
+        Restore a stage from its checkpoint when resuming, otherwise compute
+        it and checkpoint its output. A stage runs at most once per instance.
+
+        Args:
+            stage (str): Stage name.
+            compute (Callable[[], pl.DataFrame]): Computes the stage output.
+
+        Returns:
+            pl.DataFrame: Stage output.
+        """
+        if stage in self._stages:
+            return self._stages[stage]
+
+        with profile_stage(stage):
+            df = None
+            if self.checkpoints is not None and self.resume:
+                df = self.checkpoints.load(stage)
+
+            if df is None:
+                df = compute()
+                if self.checkpoints is not None:
+                    self.checkpoints.save(stage, df)
+
+        self._stages[stage] = df
+        return df
+
+    def load_patient_data(self):
+        patient_data = self.db_connector.load_table_data(
+            table_name=PATIENT_TABLE,
+            query=f"SELECT id, name, phone FROM {PATIENT_TABLE};",
+            column_names=list(PATIENT_SCHEMA),
+        )
+        logger.info("Patient data loaded successfully.")
+        return patient_data
+
+    def load_patient_batches(self):
+        """
+        Stream the patients table in batches of ``SPILL_BATCH_ROWS`` rows.
+
+        Yields:
+            pl.DataFrame: The next batch of patients.
+        """
+        yield from self.db_connector.load_table_batches(
+            table_name=PATIENT_TABLE,
+            query=f"SELECT id, name, phone FROM {PATIENT_TABLE};",
+            column_names=list(PATIENT_SCHEMA),
+            batch_size=SPILL_BATCH_ROWS,
+            dtypes=PATIENT_SCHEMA,
+        )
+
+    def load_analysis_data(self):
+        analysis_data = self.db_connector.load_table_data(
+            table_name="de.med_an_name",
+            query="""
+            SELECT id, name, is_simple, min_value, max_value FROM de.med_an_name;
+            """,
+            column_names=["id", "name", "is_simple", "min_value", "max_value"],
+        )
+        logger.info("Analysis metadata loaded successfully.")
+
+        processed_analysis_data = DataProcessLayer.process_med_an_name_data(
+            analysis_data
+        )
+        logger.info("Analysis metadata processed successfully.")
+        return processed_analysis_data
+
+    def load_validated_data(self):
+        """
+        Read and validate the medical results workbook.
+
+        Returns:
+            pl.DataFrame: Validated Polars DataFrame.
+        """
+        return self.process_polars_mde(
+            f_path=self.input_path, sheet_name="hard", model=AnalysisModel
+        )
+
+    @property
+    def input_path(self) -> Path:
+        return Path(self.settings.project_path / self.settings.med_data.file_name)
+
+    def load_results(self):
+        """
+        Validated results or, when a results index is set, the current results
+        of the patients with new or corrected results.
+
+        Returns:
+            pl.DataFrame: Results to look for outliers in.
+        """
+        if self.results_index is None:
+            return self.run_stage("validated", self.load_validated_data)
+        return self.run_stage("deduplicated", self._deduplicate)
+
+    def updated_results_index(self):
+        """
+        The results index with this run's results recorded. Compute it before
+        the checkpoints are cleared, as it reads the ``deduplicated`` stage.
+
+        Returns:
+            pl.DataFrame: The updated index, or None if there is no index.
+        """
+        if self.results_index is None:
+            return None
+        return DataProcessLayer.update_results_index(
+            self.results_index.load(), self.load_results()
+        )
+
+    def commit_results_index(self, index):
+        """
+        Save the index returned by ``updated_results_index``. Call only once
+        the results are stored, so a failed run is not deduplicated away on
+        retry.
+
+        Args:
+            index (pl.DataFrame): The updated index, or None.
+        """
+        if index is not None:
+            self.results_index.save(index)
+
+    def _deduplicate(self):
+        validated_data = self.run_stage("validated", self.load_validated_data)
+        source_ts = datetime.fromtimestamp(self.input_path.stat().st_mtime)
+        tagged = DataProcessLayer.hash_results(validated_data, source_ts)
+        current = DataProcessLayer.select_changed_results(
+            tagged, self.results_index.load()
+        )
+        logger.info(
+            f"Kept {current.height} current results of patients with new or "
+            f"corrected results out of {tagged.height} rows."
+        )
+        return current
+
+    def _find_outliers(self):
+        outliers = DataProcessLayer.get_outliers_with_details(
+            self.load_results(), self.load_analysis_data()
+        )
+        logger.info("Outliers identified successfully.")
+        return outliers
+
+    def _merge_outliers_with_patients(self):
+        pipeline = self.settings.pipeline
+        if pipeline.memory_budget_mb:
+            res = self._merge_within_budget(pipeline.memory_budget_mb * 1024 * 1024)
+        else:
+            res = DataProcessLayer.merge_with_patients(
+                self.run_stage("outliers", self._find_outliers),
+                self.load_patient_data(),
+                pipeline.min_outliers,
             )
-            logger.info("Analysis metadata loaded successfully.")
+        logger.info("Data merged successfully.")
+        return res
+
+    def _merge_within_budget(self, memory_budget: int):
+        """
+        Merge outliers with patients, partitioned by patient when the inputs
+        exceed ``memory_budget``.
 
-            processed_analysis_data = DataProcessLayer.process_med_an_name_data(
-                analysis_data
+        The cached workbook stages are dropped once the outliers are found,
+        and the outliers once they are spilled, so only this method holds
+        them. The patients are streamed from the database into their
+        partitions before any partition is merged. The merged rows, a small
+        share of the inputs, are returned in memory for the Excel report and
+        the insert.
+
+        Args:
+            memory_budget (int): Memory budget in bytes.
+
+        Returns:
+            pl.DataFrame: Merged DataFrame with patient information and conclusions.
+        """
+        pipeline = self.settings.pipeline
+        self.run_stage("outliers", self._find_outliers)
+        # Later readers of these stages recompute them, or restore them from
+        # their checkpoints when resuming.
+        for stage in ("validated", "deduplicated"):
+            self._stages.pop(stage, None)
+        outliers = self._stages.pop("outliers")
+
+        estimated = outliers.estimated_size() + self.db_connector.table_size(
+            PATIENT_TABLE
+        )
+        partitions = DataProcessLayer.spill_partition_count(estimated, memory_budget)
+        if partitions == 1:
+            return DataProcessLayer.merge_with_patients(
+                outliers, self.load_patient_data(), pipeline.min_outliers
             )
-            logger.info("Analysis metadata processed successfully.")
 
-            file_path = Path(
-                self.settings.project_path / self.settings.med_data.file_name
+        logger.info(
+            f"Inputs of ~{estimated} bytes exceed the memory budget of "
+            f"{memory_budget} bytes, merging in {partitions} partitions."
+        )
+        empty_outliers = outliers.clear()
+        with tempfile.TemporaryDirectory(
+            prefix="med_spill_", dir=pipeline.spill_path
+        ) as tmp:
+            outliers_dir = Path(tmp) / "outliers"
+            patients_dir = Path(tmp) / "patients"
+            DataProcessLayer.spill_partitions(
+                outliers.iter_slices(SPILL_BATCH_ROWS),
+                "Код пациента",
+                partitions,
+                outliers_dir,
             )
-            validated_data = self.process_polars_mde(
-                f_path=file_path, sheet_name="hard", model=AnalysisModel
+            del outliers
+            DataProcessLayer.spill_partitions(
+                self.load_patient_batches(), "id", partitions, patients_dir
+            )
+            merged = DataProcessLayer.merge_spilled_partitions(
+                outliers_dir, patients_dir, partitions, pipeline.min_outliers
             )
 
-            outliers = DataProcessLayer.get_outliers_with_details(
-                validated_data, processed_analysis_data
+        if not merged:
+            return DataProcessLayer.merge_with_patients(
+                empty_outliers,
+                pl.DataFrame(schema=PATIENT_SCHEMA),
+                pipeline.min_outliers,
             )
-            logger.info("Outliers identified successfully.")
+        return pl.concat(merged, how="vertical_relaxed")
+
+    def process_in_database(self, result_table: str):
+        """
+        Stage the workbook rows returned by ``load_results`` in PostgreSQL and
+        compute outliers and conclusions there, writing them straight into
+        ``result_table``.
+
+        Args:
+            result_table (str): Table receiving the conclusions.
+
+        Returns:
+            pl.DataFrame: Processed data with outliers and conclusions, in the
+                same shape as ``load_and_process_data``.
+        """
+        try:
+            staged_rows = self.load_results().select(
+                pl.col("Код пациента"),
+                pl.col("Анализ"),
+                pl.col("Значение").cast(pl.Float64),
+            ).rows()
 
-            res = DataProcessLayer.merge_with_patients(outliers, patient_data)
-            logger.info("Data merged successfully.")
+            res = self.db_connector.stage_and_execute(
+                staging_query=SqlProcessLayer.create_staging_table_query(),
+                staging_table=SqlProcessLayer.STAGING_TABLE,
+                staging_columns=SqlProcessLayer.STAGING_COLUMNS,
+                data=staged_rows,
+                query=SqlProcessLayer.process_and_insert_query(result_table),
+                column_names=SqlProcessLayer.RESULT_COLUMNS,
+                params={"min_outliers": self.settings.pipeline.min_outliers},
+                dtypes=SqlProcessLayer.RESULT_DTYPES,
+            )
+            logger.info("Data processed in the database successfully.")
 
             return res
         except Exception as e:
@@ -0,0 +1,122 @@
+import polars as pl
+
+
+class SqlProcessLayer:
+    """
+    A layer that builds set-based SQL mirroring DataProcessLayer, so the
+    outlier detection and conclusions run inside PostgreSQL.
+    """
+
+    STAGING_TABLE = "tmp_med_results_input"
+    STAGING_SCHEMA = """
+        patient_code BIGINT NOT NULL,
+        analysis VARCHAR(255) NOT NULL,
+        value DOUBLE PRECISION
+    """
+    STAGING_COLUMNS = ["patient_code", "analysis", "value"]
+
+    RESULT_COLUMNS = [
+        "Имя",
+        "Телефон",
+        "Название анализа",
+        "Расшифровка анализа",
+        "Значение",
+        "Заключение",
+        "is_simple",
+    ]
+    # Dtypes of the polars engine output, so both engines return equal frames.
+    RESULT_DTYPES = {
+        "Имя": pl.String,
+        "Телефон": pl.String,
+        "Название анализа": pl.String,
+        "Расшифровка анализа": pl.String,
+        "Значение": pl.Float64,
+        "Заключение": pl.String,
+        "is_simple": pl.String,
+    }
+
+    @classmethod
+    def create_staging_table_query(cls) -> str:
+        """
+        Build the statement creating the session-local staging table.
+
+        Returns:
+            str: CREATE TEMP TABLE statement.
+        """
+        return f"CREATE TEMP TABLE {cls.STAGING_TABLE} ({cls.STAGING_SCHEMA});"
+
+    @classmethod
+    def process_and_insert_query(cls, result_table: str) -> str:
+        """
+        Build one statement that detects outliers, keeps patients with at
+        least ``min_outliers`` of them, derives the conclusion, writes the
+        rows into ``result_table`` and returns the merged result.
+
+        The statement matches ``process_med_an_name_data``,
+        ``get_outliers_with_details`` and ``merge_with_patients``. It expects
+        a ``min_outliers`` named parameter.
+
+        Args:
+            result_table (str): Table receiving the conclusions.
+
+        Returns:
+            str: The SQL statement.
+        """
+        result_columns = ", ".join(f'"{col}"' for col in cls.RESULT_COLUMNS)
+        return f"""
+        WITH analysis AS (
+            SELECT
+                id,
+                name,
+                is_simple,
+                CASE WHEN is_simple = 'Y' THEN 0 ELSE min_value END
+                    ::DOUBLE PRECISION AS min_value,
+                CASE WHEN is_simple = 'Y' THEN 1 ELSE max_value END
+                    ::DOUBLE PRECISION AS max_value
+            FROM de.med_an_name
+        ),
+        outliers AS (
+            SELECT
+                r.patient_code,
+                r.analysis,
+                r.value,
+                a.name AS analysis_name,
+                a.min_value,
+                a.max_value,
+                a.is_simple,
+                COUNT(r.analysis) OVER (
+                    PARTITION BY r.patient_code
+                ) AS outlier_count
+            FROM {cls.STAGING_TABLE} r
+            JOIN analysis a ON a.id = r.analysis
+            WHERE CASE
+                WHEN a.is_simple = 'Y' THEN r.value = 1
+                ELSE r.value < a.min_value OR r.value > a.max_value
+            END
+        ),
+        merged AS (
+            SELECT
+                p.name AS "Имя",
+                p.phone AS "Телефон",
+                o.analysis AS "Название анализа",
+                o.analysis_name AS "Расшифровка анализа",
+                o.value AS "Значение",
+                CASE
+                    WHEN o.is_simple = 'Y' THEN 'Положительный'
+                    WHEN o.value > o.max_value THEN 'Повышен'
+                    WHEN o.value < o.min_value THEN 'Понижен'
+                END AS "Заключение",
+                o.is_simple
+            FROM outliers o
+            JOIN de.med_name p ON p.id = o.patient_code
+            WHERE o.outlier_count >= %(min_outliers)s
+        ),
+        inserted AS (
+            INSERT INTO {result_table}
+                ("Телефон", "Имя", "Название анализа", "Заключение")
+            SELECT "Телефон", "Имя", "Расшифровка анализа", "Заключение"
+            FROM merged
+        )
+        SELECT {result_columns}
+        FROM merged;
+        """
@@ -1,11 +1,13 @@
-__all__ = "settings"
+__all__ = ("get_settings",)
 
+from enum import Enum
+from functools import lru_cache
 from pathlib import Path
 
-from pydantic.v1 import BaseSettings
+from pydantic.v1 import BaseSettings, Field
 
 
-class MedData:
+class MedData(BaseSettings):
     class Config:
         env_prefix = "MED_"
 
@@ -37,11 +39,48 @@ class DatabaseSettings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
+class ProcessingEngine(str, Enum):
+    POLARS = "polars"
+    SQL = "sql"
+
+
+class PipelineSettings(BaseSettings):
+    class Config:
+        env_prefix = "PIPELINE_"
+
+    """
+    Configuration of the processing pipeline.
+    """
+    engine: ProcessingEngine = ProcessingEngine.POLARS
+    min_outliers: int = 2
+    checkpoints: bool = True
+    checkpoint_path: str = None
+    profile_path: str = None
+    deduplicate: bool = False
+    results_index_path: str = None
+    results_export_path: str = None
+    memory_budget_mb: int = None
+    spill_path: str = None
+
+
 class Settings(BaseSettings):
-    db = DatabaseSettings()
-    enum = YamlConfig()
-    med_data = MedData()
-    project_path = Path(__file__).resolve().parent.parent
+    db: DatabaseSettings = Field(default_factory=DatabaseSettings)
+    enum: YamlConfig = Field(default_factory=YamlConfig)
+    med_data: MedData = Field(default_factory=MedData)
+    pipeline: PipelineSettings = Field(default_factory=PipelineSettings)
+    project_path: Path = Path(__file__).resolve().parent.parent
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Build the settings on first use, so the environment and ``.env`` are only
+    read by code that needs them.
+    """
+    return Settings()
 
 
-settings = Settings()
+def __getattr__(name):
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")